@@ -1,20 +1,53 @@
+import asyncio
+import hashlib
 import os
-from typing import List, Optional
-from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Depends
+import secrets
+import threading
+import aiofiles
+import aiofiles.os
+import orjson
+from typing import Dict, Iterable, List, Optional, Tuple
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Depends, Query
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel, EmailStr
 from datetime import datetime
 from bson import ObjectId
+from cachetools import TTLCache
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
 
 from database import db, create_document, get_documents
 
 # Password hashing
 from passlib.context import CryptContext
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# All stored hashes share one cost so the dummy check below always matches a real one;
+# repeat logins are sped up by the verified-password cache rather than a lower cost
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=12)
+# Verified against when the email is unknown so both login paths cost the same bcrypt
+DUMMY_HASH = pwd_context.hash("x")
 
-app = FastAPI()
+
+def _orjson_default(o):
+    if isinstance(o, ObjectId):
+        return str(o)
+    raise TypeError
+
+
+def dumps(content) -> bytes:
+    return orjson.dumps(content, default=_orjson_default, option=orjson.OPT_NAIVE_UTC | orjson.OPT_NON_STR_KEYS)
+
+
+class MongoJSONResponse(ORJSONResponse):
+    """Serializes Mongo documents (ObjectId, naive UTC datetimes) directly with orjson."""
+
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+
+app = FastAPI(default_response_class=MongoJSONResponse)
 
 app.add_middleware(
     CORSMiddleware,
@@ -52,42 +85,131 @@ class LoginRequest(BaseModel):
 
 # -------------------- Helpers --------------------
 
-def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
+# User fields that are safe to return publicly (comment authors, video channels, channel pages)
+PUBLIC_USER_FIELDS = {"username": 1, "avatar_url": 1, "subscriber_count": 1}
+
+
+# bcrypt releases the GIL, so running it in the default executor keeps the event loop free
+async def hash_password(password: str) -> str:
+    return await asyncio.get_running_loop().run_in_executor(None, pwd_context.hash, password)
 
 
-def verify_password(password: str, hashed: str) -> bool:
-    return pwd_context.verify(password, hashed)
+# Recently verified (password, hash) pairs, keyed by a per-process keyed digest.
+# Only successes are cached, so wrong guesses always pay for a full bcrypt.
+_verified_passwords = TTLCache(maxsize=1024, ttl=300)
+_verified_passwords_lock = threading.Lock()
+_VERIFY_CACHE_KEY = secrets.token_bytes(16)
+
+
+async def verify_password(password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+    # Returns (valid, new_hash); new_hash is set when the stored hash should be upgraded
+    digest = hashlib.blake2b(f"{password}\0{hashed}".encode(), key=_VERIFY_CACHE_KEY, digest_size=16).digest()
+    with _verified_passwords_lock:
+        if digest in _verified_passwords:
+            return True, None
+    valid, new_hash = await asyncio.get_running_loop().run_in_executor(None, pwd_context.verify_and_update, password, hashed)
+    if not valid:
+        return False, None
+    with _verified_passwords_lock:
+        _verified_passwords[digest] = True
+    return True, new_hash
 
 
 def to_str_id(doc):
+    # Renames _id in place; datetimes and nested ObjectIds are left to MongoJSONResponse
     if not doc:
         return doc
-    d = {**doc}
-    if d.get("_id"):
-        d["id"] = str(d.pop("_id"))
-    # Convert datetime to isoformat
-    for k, v in list(d.items()):
-        if isinstance(v, datetime):
-            d[k] = v.isoformat()
-    return d
+    if doc.get("_id"):
+        doc["id"] = str(doc.pop("_id"))
+    return doc
+
+
+async def load_users(user_ids: Iterable[Optional[str]]) -> Dict[str, dict]:
+    # DataLoader-style: dedupe referenced user ids and resolve their public fields with one $in query.
+    # Use this whenever a handler would otherwise look users up inside a loop.
+    oids = {ObjectId(u) for u in user_ids if ObjectId.is_valid(u)}
+    if not oids:
+        return {}
+    return {
+        str(u["_id"]): u
+        async for u in db["user"].find({"_id": {"$in": list(oids)}}, PUBLIC_USER_FIELDS)
+    }
+
+
+async def attach_channels(videos: List[dict]) -> List[dict]:
+    users = await load_users(v.get("user_id") for v in videos)
+    for v in videos:
+        v["channel"] = to_str_id(users.get(v.get("user_id")))
+    return videos
+
+
+# Internal fields never returned by video endpoints; list views also drop the description
+VIDEO_FIELDS = {"content_sha256": 0}
+VIDEO_LIST_FIELDS = {**VIDEO_FIELDS, "description": 0}
+
+UPLOAD_CHUNK_SIZE = 1 << 20  # 1 MiB
+
+
+async def save_upload(upload: UploadFile, path: str) -> str:
+    # Stream to disk in fixed-size chunks so large uploads are never fully buffered in memory;
+    # returns the SHA-256 of the content, hashed as it streams
+    h = hashlib.sha256()
+    async with aiofiles.open(path, "wb") as f:
+        while chunk := await upload.read(UPLOAD_CHUNK_SIZE):
+            await f.write(chunk)
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def file_ext(filename: Optional[str], default: str) -> str:
+    # Cheaper than os.path.splitext; clients may send a path, so only the basename is used
+    # and dotfiles get the default
+    basename = (filename or "").replace("\\", "/").rpartition("/")[2]
+    stem, _, ext = basename.rpartition(".")
+    return f".{ext}" if stem and ext else default
 
 
 def objid(id_str: str) -> ObjectId:
-    try:
-        return ObjectId(id_str)
-    except Exception:
+    if not ObjectId.is_valid(id_str):
         raise HTTPException(status_code=400, detail="Invalid id format")
+    return ObjectId(id_str)
+
+
+# -------------------- Indexes --------------------
+async def create_unique_index(collection: str, keys: List[str]):
+    # Uniqueness guards (register, like/subscribe toggles) rely on these indexes, so refuse to
+    # start without them; legacy duplicates are cleaned up with migrate_dedupe.py
+    try:
+        await db[collection].create_index([(k, 1) for k in keys], unique=True)
+    except DuplicateKeyError as e:
+        raise RuntimeError(
+            f"Cannot create unique index on {collection}{keys}: existing documents are duplicated. "
+            "Review and remove them (see migrate_dedupe.py) before starting the server."
+        ) from e
+
+
+@app.on_event("startup")
+async def create_indexes():
+    if db is None:
+        return
+    await create_unique_index("user", ["email"])
+    await create_unique_index("user", ["username"])
+    await db["video"].create_index([("created_at", -1)])
+    await db["video"].create_index([("user_id", 1), ("created_at", -1), ("_id", -1)])
+    await db["video"].create_index("content_sha256")
+    await db["comment"].create_index([("video_id", 1), ("created_at", -1)])
+    await create_unique_index("like", ["video_id", "user_id"])
+    await create_unique_index("subscription", ["channel_id", "subscriber_id"])
 
 
 # -------------------- Basic Routes --------------------
 @app.get("/")
-def read_root():
+async def read_root():
     return {"message": "Video Sharing Backend is running"}
 
 
 @app.get("/test")
-def test_database():
+async def test_database():
     info = {
         "backend": "running",
         "database_connected": False,
@@ -96,7 +218,7 @@ def test_database():
     try:
         if db is not None:
             info["database_connected"] = True
-            info["collections"] = db.list_collection_names()
+            info["collections"] = await db.list_collection_names()
     except Exception as e:
         info["error"] = str(e)
     return info
@@ -104,50 +226,76 @@ def test_database():
 
 # -------------------- Auth --------------------
 @app.post("/auth/register")
-def register(payload: RegisterRequest):
-    # Uniqueness checks
-    if db["user"].find_one({"email": payload.email}):
-        raise HTTPException(status_code=400, detail="Email already in use")
-    if db["user"].find_one({"username": payload.username}):
-        raise HTTPException(status_code=400, detail="Username already in use")
+async def register(payload: RegisterRequest):
+    # One indexed lookup rejects obvious duplicates before paying for bcrypt; the unique
+    # indexes below still settle races between concurrent registrations
+    taken = await db["user"].find_one(
+        {"$or": [{"email": payload.email}, {"username": payload.username}]},
+        {"email": 1},
+    )
+    if taken:
+        field = "Email" if taken.get("email") == payload.email else "Username"
+        raise HTTPException(status_code=400, detail=f"{field} already in use")
 
     user_doc = {
         "username": payload.username,
         "email": payload.email,
-        "password_hash": hash_password(payload.password),
+        "password_hash": await hash_password(payload.password),
         "avatar_url": None,
         "bio": None,
         "created_at": datetime.utcnow(),
         "updated_at": datetime.utcnow(),
         "subscriber_count": 0,
     }
-    inserted_id = db["user"].insert_one(user_doc).inserted_id
+    try:
+        inserted_id = (await db["user"].insert_one(user_doc)).inserted_id
+    except DuplicateKeyError as e:
+        key_pattern = (e.details or {}).get("keyPattern", {})
+        field = "Username" if "username" in key_pattern else "Email"
+        raise HTTPException(status_code=400, detail=f"{field} already in use")
     user_doc["_id"] = inserted_id
     user_doc.pop("password_hash", None)
-    return to_str_id(user_doc)
+    return MongoJSONResponse(to_str_id(user_doc))
 
 
 @app.post("/auth/login")
-def login(payload: LoginRequest):
-    user = db["user"].find_one({"email": payload.email})
+async def login(payload: LoginRequest):
+    user = await db["user"].find_one({"email": payload.email})
     if not user:
+        await asyncio.get_running_loop().run_in_executor(None, pwd_context.verify, payload.password, DUMMY_HASH)
         raise HTTPException(status_code=400, detail="Invalid credentials")
-    if not verify_password(payload.password, user.get("password_hash", "")):
+    valid, new_hash = await verify_password(payload.password, user.get("password_hash", ""))
+    if not valid:
         raise HTTPException(status_code=400, detail="Invalid credentials")
+    if new_hash:
+        # Rehash anything stored at a different cost so every account matches DUMMY_HASH
+        await db["user"].update_one({"_id": user["_id"]}, {"$set": {"password_hash": new_hash}})
     # MVP: return user info; frontend will store user id and send with requests
     user.pop("password_hash", None)
-    return to_str_id(user)
+    return MongoJSONResponse(to_str_id(user))
 
 
 # Dependency to get current user id from header (MVP)
 from fastapi import Header
 
-def get_current_user_id(x_user_id: Optional[str] = Header(default=None, convert_underscores=False)) -> str:
+# Recently validated user ids; only hits are cached so unknown ids always go to Mongo
+_known_user_ids = TTLCache(maxsize=10_000, ttl=60)
+_known_user_ids_lock = threading.Lock()
+
+
+async def get_current_user_id(x_user_id: Optional[str] = Header(default=None, convert_underscores=False)) -> str:
     if not x_user_id:
         raise HTTPException(status_code=401, detail="Missing X-User-Id header")
+    if not ObjectId.is_valid(x_user_id):
+        raise HTTPException(status_code=400, detail="Invalid id format")
+    with _known_user_ids_lock:
+        if x_user_id in _known_user_ids:
+            return x_user_id
     # Validate exists
-    if not db["user"].find_one({"_id": objid(x_user_id)}):
+    if not await db["user"].find_one({"_id": ObjectId(x_user_id)}, {"_id": 1}):
         raise HTTPException(status_code=401, detail="Invalid user id")
+    with _known_user_ids_lock:
+        _known_user_ids[x_user_id] = True
     return x_user_id
 
 
@@ -162,20 +310,21 @@ async def upload_video(
     user_id: str = Depends(get_current_user_id),
 ):
     # Save video file
-    ext = os.path.splitext(file.filename)[1] or ".mp4"
-    video_filename = f"{ObjectId()}{ext}"
-    video_path = os.path.join(VIDEO_DIR, video_filename)
-    with open(video_path, "wb") as f:
-        f.write(await file.read())
+    video_filename = f"{ObjectId()}{file_ext(file.filename, '.mp4')}"
+    video_path = f"{VIDEO_DIR}/{video_filename}"
+    content_sha256 = await save_upload(file, video_path)
     video_url = f"/static/videos/{video_filename}"
+    # Reuse the stored file if the same content was uploaded before
+    duplicate = await db["video"].find_one({"content_sha256": content_sha256}, {"video_url": 1})
+    if duplicate:
+        await aiofiles.os.remove(video_path)
+        video_url = duplicate["video_url"]
 
     thumb_url = None
     if thumbnail is not None:
-        t_ext = os.path.splitext(thumbnail.filename)[1] or ".jpg"
-        thumb_filename = f"{ObjectId()}{t_ext}"
-        thumb_path = os.path.join(THUMB_DIR, thumb_filename)
-        with open(thumb_path, "wb") as tf:
-            tf.write(await thumbnail.read())
+        thumb_filename = f"{ObjectId()}{file_ext(thumbnail.filename, '.jpg')}"
+        thumb_path = f"{THUMB_DIR}/{thumb_filename}"
+        await save_upload(thumbnail, thumb_path)
         thumb_url = f"/static/thumbnails/{thumb_filename}"
 
     # Parse tags
@@ -189,37 +338,39 @@ async def upload_video(
         "description": description,
         "tags": tag_list,
         "video_url": video_url,
+        "content_sha256": content_sha256,
         "thumbnail_url": thumb_url,
         "views_count": 0,
         "likes_count": 0,
         "created_at": datetime.utcnow(),
         "updated_at": datetime.utcnow(),
     }
-    vid = db["video"].insert_one(video_doc).inserted_id
+    vid = (await db["video"].insert_one(video_doc)).inserted_id
     video_doc["_id"] = vid
-    return to_str_id(video_doc)
+    video_doc.pop("content_sha256")
+    return MongoJSONResponse(to_str_id(video_doc))
 
 
 @app.get("/videos")
-def list_videos(limit: int = 20):
-    cursor = db["video"].find({}).sort("created_at", -1).limit(limit)
-    videos = [to_str_id(v) for v in cursor]
-    return videos
+async def list_videos(limit: int = Query(20, ge=1, le=100)):
+    cursor = db["video"].find({}, VIDEO_LIST_FIELDS).sort("created_at", -1).limit(limit)
+    videos = [to_str_id(v) async for v in cursor]
+    return MongoJSONResponse(await attach_channels(videos))
 
 
 @app.get("/videos/{video_id}")
-def get_video(video_id: str):
-    v = db["video"].find_one({"_id": objid(video_id)})
+async def get_video(video_id: str):
+    # increment views atomically and read back the updated document
+    v = await db["video"].find_one_and_update(
+        {"_id": objid(video_id)},
+        {"$inc": {"views_count": 1}, "$set": {"updated_at": datetime.utcnow()}},
+        projection=VIDEO_FIELDS,
+        return_document=ReturnDocument.AFTER,
+    )
     if not v:
         raise HTTPException(status_code=404, detail="Video not found")
-    # increment views
-    db["video"].update_one({"_id": v["_id"]}, {"$inc": {"views_count": 1}, "$set": {"updated_at": datetime.utcnow()}})
-    v = db["video"].find_one({"_id": v["_id"]})
     # include channel info
-    user = db["user"].find_one({"_id": objid(v["user_id"])}) if v.get("user_id") else None
-    payload = to_str_id(v)
-    payload["channel"] = to_str_id(user) if user else None
-    return payload
+    return MongoJSONResponse((await attach_channels([to_str_id(v)]))[0])
 
 
 # -------------------- Comments --------------------
@@ -228,8 +379,8 @@ class CommentRequest(BaseModel):
 
 
 @app.post("/videos/{video_id}/comments")
-def add_comment(video_id: str, payload: CommentRequest, user_id: str = Depends(get_current_user_id)):
-    if not db["video"].find_one({"_id": objid(video_id)}):
+async def add_comment(video_id: str, payload: CommentRequest, user_id: str = Depends(get_current_user_id)):
+    if not await db["video"].find_one({"_id": objid(video_id)}, {"_id": 1}):
         raise HTTPException(status_code=404, detail="Video not found")
     comment_doc = {
         "video_id": video_id,
@@ -237,21 +388,32 @@ def add_comment(video_id: str, payload: CommentRequest, user_id: str = Depends(g
         "text": payload.text,
         "created_at": datetime.utcnow(),
     }
-    cid = db["comment"].insert_one(comment_doc).inserted_id
+    cid = (await db["comment"].insert_one(comment_doc)).inserted_id
     comment_doc["_id"] = cid
-    return to_str_id(comment_doc)
+    return MongoJSONResponse(to_str_id(comment_doc))
 
 
 @app.get("/videos/{video_id}/comments")
-def list_comments(video_id: str, limit: int = 50):
-    cursor = db["comment"].find({"video_id": video_id}).sort("created_at", -1).limit(limit)
+async def list_comments(video_id: str, limit: int = Query(50, ge=1, le=100)):
+    # Join authors in-engine; sort/limit first so only the returned page is joined
+    cursor = db["comment"].aggregate([
+        {"$match": {"video_id": video_id}},
+        {"$sort": {"created_at": -1}},
+        {"$limit": limit},
+        {"$addFields": {"user_oid": {"$toObjectId": "$user_id"}}},
+        {"$lookup": {"from": "user", "localField": "user_oid", "foreignField": "_id", "as": "user"}},
+        {"$unwind": {"path": "$user", "preserveNullAndEmptyArrays": True}},
+        {"$project": {
+            "video_id": 1, "user_id": 1, "text": 1, "created_at": 1,
+            "user._id": 1, **{f"user.{k}": 1 for k in PUBLIC_USER_FIELDS},
+        }},
+    ])
     comments = []
-    for c in cursor:
-        user = db["user"].find_one({"_id": objid(c["user_id"])}) if c.get("user_id") else None
+    async for c in cursor:
         item = to_str_id(c)
-        item["user"] = to_str_id(user) if user else None
+        item["user"] = to_str_id(item.get("user")) or None
         comments.append(item)
-    return comments
+    return MongoJSONResponse(comments)
 
 
 # -------------------- Likes --------------------
@@ -260,61 +422,96 @@ class LikeRequest(BaseModel):
 
 
 @app.post("/videos/{video_id}/like")
-def like_video(video_id: str, payload: LikeRequest, user_id: str = Depends(get_current_user_id)):
-    if not db["video"].find_one({"_id": objid(video_id)}):
+async def like_video(video_id: str, payload: LikeRequest, user_id: str = Depends(get_current_user_id)):
+    if not await db["video"].find_one({"_id": objid(video_id)}, {"_id": 1}):
         raise HTTPException(status_code=404, detail="Video not found")
-    existing = db["like"].find_one({"video_id": video_id, "user_id": user_id})
-    if existing:
-        # toggle/remove if same, else update
-        if existing.get("value", 1) == payload.value:
-            db["like"].delete_one({"_id": existing["_id"]})
-        else:
-            db["like"].update_one({"_id": existing["_id"]}, {"$set": {"value": payload.value}})
+    # Upsert in one round trip; the pre-image tells us what the like was before
+    try:
+        existing = await db["like"].find_one_and_update(
+            {"video_id": video_id, "user_id": user_id},
+            {"$set": {"value": payload.value}, "$setOnInsert": {"created_at": datetime.utcnow()}},
+            projection={"value": 1},
+            upsert=True,
+            return_document=ReturnDocument.BEFORE,
+        )
+    except DuplicateKeyError:
+        # a concurrent request inserted this like first; treat as a no-op
+        existing, old_value, new_value = None, None, None
     else:
-        db["like"].insert_one({"video_id": video_id, "user_id": user_id, "value": payload.value, "created_at": datetime.utcnow()})
-    # recompute likes_count
-    likes_count = db["like"].count_documents({"video_id": video_id, "value": 1})
-    db["video"].update_one({"_id": objid(video_id)}, {"$set": {"likes_count": likes_count}})
-    return {"video_id": video_id, "likes_count": likes_count}
+        old_value = existing.get("value", 1) if existing else None
+        new_value = payload.value
+    if old_value == payload.value:
+        # same value again toggles the like off
+        if (await db["like"].delete_one({"_id": existing["_id"], "value": payload.value})).deleted_count:
+            new_value = None
+    # adjust likes_count incrementally instead of recounting
+    delta = int(new_value == 1) - int(old_value == 1)
+    v = await db["video"].find_one_and_update(
+        {"_id": objid(video_id)},
+        {"$inc": {"likes_count": delta}},
+        projection={"likes_count": 1},
+        return_document=ReturnDocument.AFTER,
+    )
+    return {"video_id": video_id, "likes_count": v["likes_count"] if v else 0}
 
 
 # -------------------- Subscriptions & Channel --------------------
 @app.post("/channels/{channel_id}/subscribe")
-def subscribe_channel(channel_id: str, user_id: str = Depends(get_current_user_id)):
+async def subscribe_channel(channel_id: str, user_id: str = Depends(get_current_user_id)):
     if channel_id == user_id:
         raise HTTPException(status_code=400, detail="Cannot subscribe to yourself")
-    if not db["user"].find_one({"_id": objid(channel_id)}):
+    if not await db["user"].find_one({"_id": objid(channel_id)}, {"_id": 1}):
         raise HTTPException(status_code=404, detail="Channel not found")
-    existing = db["subscription"].find_one({"channel_id": channel_id, "subscriber_id": user_id})
-    if existing:
-        # toggle unsubscribe
-        db["subscription"].delete_one({"_id": existing["_id"]})
-    else:
-        db["subscription"].insert_one({"channel_id": channel_id, "subscriber_id": user_id, "created_at": datetime.utcnow()})
-    sub_count = db["subscription"].count_documents({"channel_id": channel_id})
-    db["user"].update_one({"_id": objid(channel_id)}, {"$set": {"subscriber_count": sub_count}})
+    try:
+        await db["subscription"].insert_one({"channel_id": channel_id, "subscriber_id": user_id, "created_at": datetime.utcnow()})
+        delta = 1
+    except DuplicateKeyError:
+        # already subscribed: toggle unsubscribe
+        delta = -(await db["subscription"].delete_one({"channel_id": channel_id, "subscriber_id": user_id})).deleted_count
+    channel = await db["user"].find_one_and_update(
+        {"_id": objid(channel_id)},
+        {"$inc": {"subscriber_count": delta}},
+        projection={"subscriber_count": 1},
+        return_document=ReturnDocument.AFTER,
+    )
+    sub_count = channel.get("subscriber_count", 0) if channel else 0
     return {"channel_id": channel_id, "subscriber_count": sub_count}
 
 
 @app.get("/channels/{channel_id}")
-def get_channel(channel_id: str):
-    user = db["user"].find_one({"_id": objid(channel_id)})
+async def get_channel(
+    channel_id: str,
+    limit: int = Query(20, ge=1, le=100),
+    before: Optional[datetime] = None,
+    before_id: Optional[str] = None,
+):
+    user = await db["user"].find_one({"_id": objid(channel_id)}, {**PUBLIC_USER_FIELDS, "bio": 1})
     if not user:
         raise HTTPException(status_code=404, detail="Channel not found")
-    sub_count = db["subscription"].count_documents({"channel_id": channel_id})
-    videos = [to_str_id(v) for v in db["video"].find({"user_id": channel_id}).sort("created_at", -1)]
+    # Keyset pagination: pass the last video's created_at and id as `before`/`before_id`
+    # to get the next page; _id breaks ties between videos sharing a timestamp
+    query = {"user_id": channel_id}
+    if before is not None and before_id is not None:
+        query["$or"] = [
+            {"created_at": {"$lt": before}},
+            {"created_at": before, "_id": {"$lt": objid(before_id)}},
+        ]
+    elif before is not None:
+        query["created_at"] = {"$lt": before}
+    cursor = db["video"].find(query, VIDEO_LIST_FIELDS).sort([("created_at", -1), ("_id", -1)]).limit(limit)
+    videos = [to_str_id(v) async for v in cursor]
     payload = to_str_id(user)
-    payload["subscriber_count"] = sub_count
+    payload["subscriber_count"] = user.get("subscriber_count", 0)
     payload["videos"] = videos
-    return payload
+    return MongoJSONResponse(payload)
 
 
 # -------------------- Simple Search/Feed --------------------
 @app.get("/feed")
-def feed(limit: int = 20):
+async def feed(limit: int = Query(20, ge=1, le=100)):
     # Trending = most recent for MVP
-    videos = [to_str_id(v) for v in db["video"].find({}).sort("created_at", -1).limit(limit)]
-    return videos
+    videos = [to_str_id(v) async for v in db["video"].find({}, VIDEO_LIST_FIELDS).sort("created_at", -1).limit(limit)]
+    return MongoJSONResponse(await attach_channels(videos))
 
 
 if __name__ == "__main__":
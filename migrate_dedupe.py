@@ -0,0 +1,87 @@
+"""
+One-off migration: remove duplicate likes and subscriptions
+
+Before the unique (video_id, user_id) and (channel_id, subscriber_id) indexes existed, the
+like/subscribe toggles were check-then-insert and could race, leaving duplicate rows that stop
+the server from building those indexes at startup.
+
+For each duplicated key the most recent row is kept, since it reflects the user's latest
+action, and the affected likes_count / subscriber_count are recounted. Runs as a dry run
+unless --apply is given; every row that is (or would be) deleted is printed.
+
+Duplicate users (email/username) are only reported: merging accounts needs a human decision.
+
+Usage:
+    python migrate_dedupe.py            # report only
+    python migrate_dedupe.py --apply    # delete duplicates and fix counters
+"""
+
+import argparse
+import asyncio
+
+from bson import ObjectId
+
+from database import db
+
+
+async def find_duplicates(collection: str, keys: list):
+    # Newest first, so docs[0] is the row to keep
+    pipeline = [
+        {"$sort": {"_id": -1}},
+        {"$group": {"_id": {k: f"${k}" for k in keys}, "docs": {"$push": "$$ROOT"}, "n": {"$sum": 1}}},
+        {"$match": {"n": {"$gt": 1}}},
+    ]
+    async for group in db[collection].aggregate(pipeline, allowDiskUse=True):
+        yield group["_id"], group["docs"]
+
+
+async def dedupe(collection: str, keys: list, apply: bool) -> list:
+    """Drop all but the newest row per key; returns the keys that had duplicates"""
+    duplicated = []
+    async for key, docs in find_duplicates(collection, keys):
+        keep, drop = docs[0], docs[1:]
+        print(f"{collection} {key}: keeping {keep}")
+        for doc in drop:
+            print(f"{collection} {key}: {'deleting' if apply else 'would delete'} {doc}")
+        if apply:
+            await db[collection].delete_many({"_id": {"$in": [d["_id"] for d in drop]}})
+        duplicated.append(key)
+    return duplicated
+
+
+async def recount_likes(key: dict):
+    video_id = key.get("video_id")
+    if not ObjectId.is_valid(video_id):
+        return
+    likes_count = await db["like"].count_documents({"video_id": video_id, "value": 1})
+    await db["video"].update_one({"_id": ObjectId(video_id)}, {"$set": {"likes_count": likes_count}})
+
+
+async def recount_subscribers(key: dict):
+    channel_id = key.get("channel_id")
+    if not ObjectId.is_valid(channel_id):
+        return
+    sub_count = await db["subscription"].count_documents({"channel_id": channel_id})
+    await db["user"].update_one({"_id": ObjectId(channel_id)}, {"$set": {"subscriber_count": sub_count}})
+
+
+async def main(apply: bool):
+    if db is None:
+        raise SystemExit("Database not available. Check DATABASE_URL and DATABASE_NAME environment variables.")
+
+    for key in await dedupe("like", ["video_id", "user_id"], apply):
+        if apply:
+            await recount_likes(key)
+    for key in await dedupe("subscription", ["channel_id", "subscriber_id"], apply):
+        if apply:
+            await recount_subscribers(key)
+
+    for field in ("email", "username"):
+        async for key, docs in find_duplicates("user", [field]):
+            print(f"user {key}: duplicated by {[str(d['_id']) for d in docs]}; resolve manually")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--apply", action="store_true", help="delete duplicates instead of only reporting them")
+    asyncio.run(main(parser.parse_args().apply))
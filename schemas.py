@@ -29,6 +29,7 @@ class Video(BaseModel):
     description: Optional[str] = None
     tags: List[str] = Field(default_factory=list)
     video_url: str
+    content_sha256: Optional[str] = Field(None, description="SHA-256 of the video file, used to dedupe uploads")
     thumbnail_url: Optional[str] = None
     views_count: int = 0
     likes_count: int = 0